@@ -21,11 +21,12 @@
 from __future__ import annotations
 
 import asyncio
-import contextlib
+import bisect
+import itertools
 import os
+import select
 import time
 import typing
-from collections import defaultdict
 
 import pywayland
 import pywayland.server
@@ -34,7 +35,7 @@ import wlroots.wlr_types.virtual_keyboard_v1 as vkeyboard
 import wlroots.wlr_types.virtual_pointer_v1 as vpointer
 from pywayland import lib as wllib
 from pywayland.protocol.wayland import WlSeat
-from wlroots import xwayland
+from wlroots import lib, xwayland
 from wlroots.wlr_types import (
     DataControlManagerV1,
     DataDeviceManager,
@@ -75,9 +76,8 @@ from wlroots.wlr_types.server_decoration import (
     ServerDecorationManagerMode,
 )
 from wlroots.wlr_types.xdg_shell import XdgShell, XdgSurface, XdgSurfaceRole
-from xkbcommon import xkb
 
-from libqtile import hook, log_utils
+from libqtile import config, hook, log_utils
 from libqtile.backend import base
 from libqtile.backend.wayland import inputs, layer, window, wlrq, xdgwindow, xwindow
 from libqtile.backend.wayland.output import Output
@@ -85,15 +85,22 @@ from libqtile.command.base import expose_command
 from libqtile.log_utils import logger
 
 if typing.TYPE_CHECKING:
-    from typing import Any, Generator
+    from typing import Any
 
     from pywayland.server import Listener
     from wlroots.wlr_types import Output as wlrOutput
     from wlroots.wlr_types.data_device_manager import Drag
 
-    from libqtile import config
     from libqtile.core.manager import Qtile
 
+# Scroll button numbers indexed by [is horizontal][is positive delta]
+_AXIS_BUTTONS = ((4, 5), (6, 7))
+# Raw enum values, compared directly against the fields of pointer event structs
+_AXIS_HORIZONTAL = pointer.AxisOrientation.HORIZONTAL.value
+_BUTTON_PRESSED = input_device.ButtonState.PRESSED.value
+# The most times the event loop is dispatched per wakeup while it has events ready
+_MAX_DISPATCH = 8
+
 
 class Core(base.Core, wlrq.HasListeners):
     supports_restarting: bool = False
@@ -104,6 +111,24 @@ class Core(base.Core, wlrq.HasListeners):
 
         # This is the window under the pointer
         self._hovered_window: window.WindowType | None = None
+        # Whether we have given pointer focus to a client surface. Pointer frame and
+        # gesture events are only forwarded to the seat when this is set.
+        self._pointer_has_focus: bool = False
+        # The layout coordinates of the surface with pointer focus, which are used to send
+        # it motion for every event while hit-testing is deferred.
+        self._pointer_origin: tuple[float, float] | None = None
+        # This is incremented whenever windows are restacked, moved, resized or change
+        # their surfaces, so anything cached from their positions can tell it is stale.
+        self._z_epoch: int = 0
+        # The area of the hovered window, in layout coordinates, within which pointer
+        # motion can only land on that window, and the _z_epoch it was found at. It is
+        # empty if the hovered window is partially covered.
+        self._hover_rect: tuple[float, float, float, float] | None = None
+        self._hover_epoch: int = -1
+        # Hit-testing is coalesced while the event loop is dispatched, so that only the
+        # latest cursor position is checked. This holds the time of the last motion event
+        # not yet hit-tested.
+        self._pending_motion: int | None = None
         # but this Internal receives keyboard input, e.g. via the Prompt widget.
         self.focused_internal: window.Internal | None = None
 
@@ -127,23 +152,43 @@ class Core(base.Core, wlrq.HasListeners):
         os.environ["WAYLAND_DISPLAY"] = self.socket.decode()
         logger.info("Starting core with WAYLAND_DISPLAY=%s", self.socket.decode())
 
-        # These windows have not been mapped yet; they'll get managed when mapped
-        self.pending_windows: set[window.WindowType] = set()
+        # These windows have not been mapped yet; they'll get managed when mapped. They
+        # are keyed by the address of their surface's C struct (see wlrq.ptr_key).
+        self.pending_windows: dict[int, window.WindowType] = {}
 
+        # These are dicts used as insertion-ordered sets, giving cheap membership tests
+        # and removal while preserving the Z order.
         # mapped_windows contains just regular windows
-        self.mapped_windows: list[window.WindowType] = []  # Ascending in Z
-        # stacked_windows also contains layer_shell windows from the current output
-        self.stacked_windows: list[window.WindowType] = []  # Ascending in Z
+        self.mapped_windows: dict[window.WindowType, None] = {}  # Ascending in Z
+        # The windows in mapped_windows that have idle inhibitors
+        self._inhibiting_windows: set[window.Window | window.Static] = set()
+        # stacked_windows also contains layer_shell windows from the current output. It
+        # is composed lazily from the per-layer tiers when they have changed.
+        self._stacked_windows: dict[window.WindowType, None] = {}  # Ascending in Z
+        self._stack_dirty: bool = False
         self._current_output: Output | None = None
+        # Maps the addresses of mapped windows' wlr_surfaces to the windows
+        self._surface_owner: dict[int, window.Window | window.Static] = {}
+        # The next window ID to hand out. These are never reused.
+        self._next_wid: int = 1
 
         # set up inputs
         self.keyboards: list[inputs.Keyboard] = []
         self._pointers: list[inputs.Pointer] = []
-        self.grabbed_keys: list[tuple[int, int]] = []
+        # The result of get_inputs, reset to None when devices are added or removed
+        self._inputs_info: dict[str, list[dict[str, str]]] | None = None
+        self.grabbed_keys: set[tuple[int, int]] = set()
+        # Whether any Drag bindings are grabbed, which need to know about pointer motion
+        self._has_motion_bindings: bool = False
         DataDeviceManager(self.display)
         self.live_dnd: wlrq.Dnd | None = None
         DataControlManagerV1(self.display)
         self.seat = seat.Seat(self.display, "seat0")
+        # These are bound once as they are called for most pointer events
+        self._notify_clear = self.seat.pointer_notify_clear_focus
+        self._notify_enter = self.seat.pointer_notify_enter
+        self._notify_frame = self.seat.pointer_notify_frame
+        self._notify_motion = self.seat.pointer_notify_motion
         self.add_listener(self.seat.request_set_selection_event, self._on_request_set_selection)
         self.add_listener(
             self.seat.request_set_primary_selection_event, self._on_request_set_primary_selection
@@ -166,18 +211,25 @@ class Core(base.Core, wlrq.HasListeners):
 
         # set up outputs
         self.outputs: list[Output] = []
+        # The (x1, y1, x2, y2) extents of each output in the layout, for hit-testing
+        self._output_rects: tuple[tuple[int, int, int, int, Output], ...] = ()
         self.add_listener(self.backend.new_output_event, self._on_new_output)
         self.output_layout = OutputLayout()
         self.add_listener(self.output_layout.change_event, self._on_output_layout_change)
+        # Whether output management clients need to be sent the new output configuration
+        self._layout_dirty: bool = False
         self.output_manager = OutputManagerV1(self.display)
         self.add_listener(self.output_manager.apply_event, self._on_output_manager_apply)
         self.add_listener(self.output_manager.test_event, self._on_output_manager_test)
+        # Configurations received from the output manager, processed when the loop is idle
+        self._pending_output_configs: list[tuple[OutputConfigurationV1, bool]] = []
         self._blanked_outputs: set[Output] = set()
 
         # set up cursor
         self.cursor = Cursor(self.output_layout)
         self.cursor_manager = XCursorManager(24)
         self._gestures = PointerGesturesV1(self.display)
+        self._gestures_ptr = self._gestures._ptr
         self.add_listener(self.seat.request_set_cursor_event, self._on_request_cursor)
         self.add_listener(self.cursor.axis_event, self._on_cursor_axis)
         self.add_listener(self.cursor.frame_event, self._on_cursor_frame)
@@ -210,6 +262,7 @@ class Core(base.Core, wlrq.HasListeners):
             output_power_manager.set_mode_event, self._on_output_power_manager_set_mode
         )
         self.idle = Idle(self.display)
+        self._last_idle_notify: float = 0.0
         idle_ihibitor_manager = IdleInhibitorManagerV1(self.display)
         self.add_listener(idle_ihibitor_manager.new_inhibitor_event, self._on_new_idle_inhibitor)
         PrimarySelectionV1DeviceManager(self.display)
@@ -238,7 +291,16 @@ class Core(base.Core, wlrq.HasListeners):
         )
         self.pointer_constraints: set[window.PointerConstraint] = set()
         self.active_pointer_constraint: window.PointerConstraint | None = None
+        # The bounds of the active pointer constraint's rect, cached for the motion handler
+        self._apc_x1: int = 0
+        self._apc_y1: int = 0
+        self._apc_x2: int = 0
+        self._apc_y2: int = 0
         self._relative_pointer_manager_v1 = RelativePointerManagerV1(self.display)
+        # Raw pointers used by the pointer motion handler to call into wlroots directly
+        self._seat_ptr = self.seat._ptr
+        self._cursor_ptr = self.cursor._ptr
+        self._relative_pointer_manager_ptr = self._relative_pointer_manager_v1._ptr
         self.foreign_toplevel_manager_v1 = ForeignToplevelManagerV1.create(self.display)
 
         # Set up XWayland
@@ -259,10 +321,9 @@ class Core(base.Core, wlrq.HasListeners):
         # Place cursor in middle of centre output
         x = y = 0
         if box := self.output_layout.get_box():
-            if output := self.output_layout.output_at(box.width / 2, box.height / 2):
+            if output := self.output_layout.output_at(*wlrq.box_center(box)):
                 if box := self.output_layout.get_box(reference=output):
-                    x = box.x + box.width / 2
-                    y = box.y + box.height / 2
+                    x, y = wlrq.box_center(box)
         self.warp_pointer(x, y)
         self.cursor_manager.set_cursor_image("left_ptr", self.cursor)
 
@@ -354,7 +415,7 @@ class Core(base.Core, wlrq.HasListeners):
         wlr_output.enable()
         wlr_output.commit()
 
-        self.outputs.append(Output(self, wlr_output))
+        bisect.insort(self.outputs, Output(self, wlr_output))
         # Put new output at far right
         layout_geo = self.output_layout.get_box()
         x = layout_geo.width if layout_geo else 0
@@ -365,29 +426,52 @@ class Core(base.Core, wlrq.HasListeners):
 
     def _on_output_layout_change(self, _listener: Listener, _data: Any) -> None:
         logger.debug("Signal: output_layout change_event")
-        config = OutputConfigurationV1()
+        self._z_epoch += 1
 
+        rects = []
         for output in self.outputs:
+            x, y, width, height = wlrq.output_layout_box(self.output_layout, output.wlr_output)
+            output.x = x
+            output.y = y
+            output._sort_key = (x, y)
+            rects.append((x, y, x + width, y + height, output))
+
+        self.outputs.sort()
+        self._output_rects = tuple(rects)
+
+        # Layout changes often come in bursts, so the configuration sent to output
+        # management clients is only rebuilt once per event loop iteration.
+        if self.qtile is None:
+            self._flush_output_config()
+        elif not self._layout_dirty:
+            self._layout_dirty = True
+            self.qtile.call_soon(self._flush_output_config)
+
+    def _flush_output_config(self) -> None:
+        """Send the current output configuration to output management clients."""
+        self._layout_dirty = False
+        config = OutputConfigurationV1()
+
+        # The integer layout coordinates are kept with the output rects
+        for x, y, _, _, output in self._output_rects:
             head = OutputConfigurationHeadV1.create(config, output.wlr_output)
             mode = output.wlr_output.current_mode
             head.state.mode = mode
             head.state.enabled = mode is not None and output.wlr_output.enabled
-            box = self.output_layout.get_box(output.wlr_output)
-            head.state.x = output.x = box.x if box else 0
-            head.state.y = output.y = box.y if box else 0
+            head.state.x = x
+            head.state.y = y
 
         self.output_manager.set_configuration(config)
-        self.outputs.sort(key=lambda o: (o.x, o.y))
 
     def _on_output_manager_apply(
         self, _listener: Listener, config: OutputConfigurationV1
     ) -> None:
         logger.debug("Signal: output_manager apply_event")
-        self._output_manager_reconfigure(config, True)
+        self._queue_output_manager_reconfigure(config, True)
 
     def _on_output_manager_test(self, _listener: Listener, config: OutputConfigurationV1) -> None:
         logger.debug("Signal: output_manager test_event")
-        self._output_manager_reconfigure(config, False)
+        self._queue_output_manager_reconfigure(config, False)
 
     def _on_request_cursor(
         self, _listener: Listener, event: seat.PointerRequestSetCursorEvent
@@ -407,151 +491,191 @@ class Core(base.Core, wlrq.HasListeners):
         if surface.role == XdgSurfaceRole.TOPLEVEL:
             assert self.qtile is not None
             win = xdgwindow.XdgWindow(self, self.qtile, surface)
-            self.pending_windows.add(win)
+            self.pending_windows[wlrq.ptr_key(surface)] = win
 
     def _on_cursor_axis(self, _listener: Listener, event: pointer.PointerEventAxis) -> None:
+        self._flush_pointer_motion()
         handled = False
+        ptr = event._ptr
+        delta = ptr.delta
 
-        if event.delta != 0 and not self.exclusive_client:
+        if delta != 0 and not self.exclusive_client:
             # If we have a client who exclusively gets input, button bindings are disallowed.
-            if event.orientation == pointer.AxisOrientation.VERTICAL:
-                button = 5 if 0 < event.delta else 4
-            else:
-                button = 7 if 0 < event.delta else 6
+            button = _AXIS_BUTTONS[ptr.orientation == _AXIS_HORIZONTAL][delta > 0]
             handled = self._process_cursor_button(button, True)
 
         if not handled:
-            self.seat.pointer_notify_axis(
-                event.time_msec,
-                event.orientation,
-                event.delta,
-                event.delta_discrete,
-                event.source,
+            # The raw enum values are passed straight to wlroots, as the pywlroots Seat
+            # wrapper expects enum members.
+            lib.wlr_seat_pointer_notify_axis(
+                self._seat_ptr,
+                ptr.time_msec,
+                ptr.orientation,
+                delta,
+                ptr.delta_discrete,
+                ptr.source,
             )
 
     def _on_cursor_frame(self, _listener: Listener, _data: Any) -> None:
-        self.seat.pointer_notify_frame()
+        if self._pointer_has_focus:
+            self._notify_frame()
 
     def _on_cursor_button(self, _listener: Listener, event: pointer.PointerEventButton) -> None:
         assert self.qtile is not None
-        self.idle.notify_activity(self.seat)
-        pressed = event.button_state == input_device.ButtonState.PRESSED
+        self._touch_idle()
+        self._flush_pointer_motion()
+        ptr = event._ptr
+        pressed = ptr.state == _BUTTON_PRESSED
         if pressed:
             self._focus_by_click()
 
         handled = False
 
-        if not self.exclusive_client and event.button in wlrq.buttons:
+        button = wlrq.BUTTON_MAP.get(ptr.button)
+        if button is not None and not self.exclusive_client:
             # If we have a client who exclusively gets input, button bindings are disallowed.
-            button = wlrq.buttons.index(event.button) + 1
             handled = self._process_cursor_button(button, pressed)
 
         if not handled:
-            self.seat.pointer_notify_button(event.time_msec, event.button, event.button_state)
+            lib.wlr_seat_pointer_notify_button(
+                self._seat_ptr, ptr.time_msec, ptr.button, ptr.state
+            )
 
     def _on_cursor_motion(self, _listener: Listener, event: pointer.PointerEventMotion) -> None:
         assert self.qtile is not None
-        self.idle.notify_activity(self.seat)
+        self._touch_idle()
 
-        dx = event.delta_x
-        dy = event.delta_y
+        # This is called for every pointer sample, so we read the event struct and call
+        # wlroots directly rather than going through the pywlroots wrappers.
+        ptr = event._ptr
+        dx = ptr.delta_x
+        dy = ptr.delta_y
 
         # Send relative pointer events to seat - used e.g. by games that have
         # constrained cursor movement but want movement events
-        self._relative_pointer_manager_v1.send_relative_motion(
-            self.seat,
-            event.time_msec * 1000,
+        lib.wlr_relative_pointer_manager_v1_send_relative_motion(
+            self._relative_pointer_manager_ptr,
+            self._seat_ptr,
+            ptr.time_msec * 1000,
             dx,
             dy,
-            event.unaccel_delta_x,
-            event.unaccel_delta_y,
+            ptr.unaccel_dx,
+            ptr.unaccel_dy,
         )
 
         if self.active_pointer_constraint:
-            if not self.active_pointer_constraint.rect.contains_point(
-                self.cursor.x + dx, self.cursor.y + dy
-            ):
+            nx = self.cursor.x + dx
+            ny = self.cursor.y + dy
+            if not (self._apc_x1 <= nx < self._apc_x2 and self._apc_y1 <= ny < self._apc_y2):
                 return
 
-        self.cursor.move(dx, dy, input_device=event.device)
-        self._process_cursor_motion(event.time_msec, self.cursor.x, self.cursor.y)
+        lib.wlr_cursor_move(self._cursor_ptr, ptr.device, dx, dy)
+        self._notify_pointer_motion(ptr.time_msec)
 
     def _on_cursor_motion_absolute(
         self, _listener: Listener, event: pointer.PointerEventMotionAbsolute
     ) -> None:
         assert self.qtile is not None
-        self.idle.notify_activity(self.seat)
+        self._touch_idle()
         self.cursor.warp(
             WarpMode.AbsoluteClosest,
             event.x,
             event.y,
             input_device=event.device,
         )
-        self._process_cursor_motion(event.time_msec, self.cursor.x, self.cursor.y)
+        self._notify_pointer_motion(event.time_msec)
 
     def _on_cursor_pinch_begin(
         self,
         _listener: Listener,
         event: pointer.PointerEventPinchBegin,
     ) -> None:
-        self.idle.notify_activity(self.seat)
-        self._gestures.send_pinch_begin(self.seat, event.time_msec, event.fingers)
+        self._touch_idle()
+        self._flush_pointer_motion()
+        if self._pointer_has_focus:
+            self._gestures.send_pinch_begin(self.seat, event.time_msec, event.fingers)
 
     def _on_cursor_pinch_update(
         self,
         _listener: Listener,
         event: pointer.PointerEventPinchUpdate,
     ) -> None:
-        self._gestures.send_pinch_update(
-            self.seat, event.time_msec, event.dx, event.dy, event.scale, event.rotation
-        )
+        # Updates arrive at the touchpad's sample rate so we call wlroots directly
+        self._flush_pointer_motion()
+        if self._pointer_has_focus:
+            ptr = event._ptr
+            lib.wlr_pointer_gestures_v1_send_pinch_update(
+                self._gestures_ptr,
+                self._seat_ptr,
+                ptr.time_msec,
+                ptr.dx,
+                ptr.dy,
+                ptr.scale,
+                ptr.rotation,
+            )
 
     def _on_cursor_pinch_end(
         self,
         _listener: Listener,
         event: pointer.PointerEventPinchEnd,
     ) -> None:
-        self.idle.notify_activity(self.seat)
-        self._gestures.send_pinch_end(self.seat, event.time_msec, event.cancelled)
+        self._touch_idle()
+        self._flush_pointer_motion()
+        if self._pointer_has_focus:
+            self._gestures.send_pinch_end(self.seat, event.time_msec, event.cancelled)
 
     def _on_cursor_swipe_begin(
         self,
         _listener: Listener,
         event: pointer.PointerEventSwipeBegin,
     ) -> None:
-        self.idle.notify_activity(self.seat)
-        self._gestures.send_swipe_begin(self.seat, event.time_msec, event.fingers)
+        self._touch_idle()
+        self._flush_pointer_motion()
+        if self._pointer_has_focus:
+            self._gestures.send_swipe_begin(self.seat, event.time_msec, event.fingers)
 
     def _on_cursor_swipe_update(
         self,
         _listener: Listener,
         event: pointer.PointerEventSwipeUpdate,
     ) -> None:
-        self._gestures.send_swipe_update(self.seat, event.time_msec, event.dx, event.dy)
+        # Updates arrive at the touchpad's sample rate so we call wlroots directly
+        self._flush_pointer_motion()
+        if self._pointer_has_focus:
+            ptr = event._ptr
+            lib.wlr_pointer_gestures_v1_send_swipe_update(
+                self._gestures_ptr, self._seat_ptr, ptr.time_msec, ptr.dx, ptr.dy
+            )
 
     def _on_cursor_swipe_end(
         self,
         _listener: Listener,
         event: pointer.PointerEventSwipeEnd,
     ) -> None:
-        self.idle.notify_activity(self.seat)
-        self._gestures.send_swipe_end(self.seat, event.time_msec, event.cancelled)
+        self._touch_idle()
+        self._flush_pointer_motion()
+        if self._pointer_has_focus:
+            self._gestures.send_swipe_end(self.seat, event.time_msec, event.cancelled)
 
     def _on_cursor_hold_begin(
         self,
         _listener: Listener,
         event: pointer.PointerEventHoldBegin,
     ) -> None:
-        self.idle.notify_activity(self.seat)
-        self._gestures.send_hold_begin(self.seat, event.time_msec, event.fingers)
+        self._touch_idle()
+        self._flush_pointer_motion()
+        if self._pointer_has_focus:
+            self._gestures.send_hold_begin(self.seat, event.time_msec, event.fingers)
 
     def _on_cursor_hold_end(
         self,
         _listener: Listener,
         event: pointer.PointerEventHoldEnd,
     ) -> None:
-        self.idle.notify_activity(self.seat)
-        self._gestures.send_hold_end(self.seat, event.time_msec, event.cancelled)
+        self._touch_idle()
+        self._flush_pointer_motion()
+        if self._pointer_has_focus:
+            self._gestures.send_hold_end(self.seat, event.time_msec, event.cancelled)
 
     def _on_new_pointer_constraint(
         self, _listener: Listener, wlr_constraint: PointerConstraintV1
@@ -584,6 +708,14 @@ class Core(base.Core, wlrq.HasListeners):
         if self.qtile is None:
             return
 
+        # Try to find the mapped window that owns the surface directly, otherwise fall
+        # back to searching all surfaces of all windows, e.g. for popups.
+        root = lib.wlr_surface_get_root_surface(idle_inhibitor.surface._ptr)
+        owner = self._surface_owner.get(wlrq.ptr_key(root))
+        if owner is not None:
+            owner.add_idle_inhibitor(idle_inhibitor.surface, 0, 0, idle_inhibitor)
+            return
+
         for win in self.qtile.windows_map.values():
             if isinstance(win, (window.Window, window.Static)):
                 win.surface.for_each_surface(win.add_idle_inhibitor, idle_inhibitor)
@@ -610,7 +742,7 @@ class Core(base.Core, wlrq.HasListeners):
             # surfaces are allowed to get pointer input.
             if isinstance(win, base.Internal) or not win.belongs_to_client(self.exclusive_client):
                 self.cursor_manager.set_cursor_image("left_ptr", self.cursor)
-                self.seat.pointer_notify_clear_focus()
+                self._clear_pointer_focus()
                 return
 
     def _on_input_inhibitor_deactivate(self, _listener: Listener, _data: Any) -> None:
@@ -662,7 +794,9 @@ class Core(base.Core, wlrq.HasListeners):
         logger.debug("Signal: xwayland ready")
         assert self._xwayland is not None
         self._xwayland.set_seat(self.seat)
-        self.xwayland_atoms: dict[int, str] = wlrq.get_xwayland_atoms(self._xwayland)
+        self.xwayland_atoms_arr: list[str | None]
+        self.xwayland_atoms: dict[int, str]
+        self.xwayland_atoms_arr, self.xwayland_atoms = wlrq.get_xwayland_atoms(self._xwayland)
 
         # Set the default XWayland cursor
         xcursor = self.cursor_manager.get_xcursor("left_ptr")
@@ -682,15 +816,46 @@ class Core(base.Core, wlrq.HasListeners):
         logger.debug("Signal: xwayland new_surface")
         assert self.qtile is not None
         win = xwindow.XWindow(self, self.qtile, surface)
-        self.pending_windows.add(win)
+        self.pending_windows[wlrq.ptr_key(surface)] = win
+
+    def _queue_output_manager_reconfigure(
+        self, config: OutputConfigurationV1, apply: bool
+    ) -> None:
+        """
+        Queue an output configuration to be tested or applied. Configurations received
+        during the same event loop iteration are coalesced and handled together.
+        """
+        assert self.qtile is not None
+        if not self._pending_output_configs:
+            self.qtile.call_soon(self._flush_output_manager_reconfigure)
+        self._pending_output_configs.append((config, apply))
+
+    def _flush_output_manager_reconfigure(self) -> None:
+        pending = self._pending_output_configs
+        self._pending_output_configs = []
+
+        # Of consecutive requests of the same kind, only the latest is tried. Earlier
+        # ones would be superseded immediately, so they are reported as failed without
+        # touching the outputs. Requests of different kinds are all handled in order,
+        # so that e.g. a test cannot cause a preceding apply to be dropped.
+        for (output_config, apply), (_, next_apply) in zip(pending, pending[1:]):
+            if apply == next_apply:
+                output_config.send_failed()
+                output_config.destroy()
+            else:
+                self._output_manager_reconfigure(output_config, apply)
+
+        config, apply = pending[-1]
+        self._output_manager_reconfigure(config, apply)
 
     def _output_manager_reconfigure(self, config: OutputConfigurationV1, apply: bool) -> None:
         """
         See if an output configuration would be accepted by the backend, and apply it if
         desired.
-        """
-        ok = True
 
+        This is done in three passes: first all heads' states are written, then they are
+        all tested, then they are all either committed or rolled back.
+        """
         for head in config.heads:
             state = head.state
             wlr_output = state.output
@@ -717,9 +882,7 @@ class Core(base.Core, wlrq.HasListeners):
                     wlr_output.enable(enable=False)
                 self.output_layout.remove(wlr_output)
 
-            ok = wlr_output.test()
-            if not ok:
-                break
+        ok = all(head.state.output.test() for head in config.heads)
 
         for head in config.heads:
             if ok and apply:
@@ -736,26 +899,91 @@ class Core(base.Core, wlrq.HasListeners):
 
     def _process_cursor_motion(self, time_msec: int, cx: float, cy: float) -> None:
         assert self.qtile
-        cx_int = int(cx)
-        cy_int = int(cy)
 
-        if not self.exclusive_client:
+        if self._has_motion_bindings and not self.exclusive_client:
             # If we have a client who exclusively gets input, button bindings are
             # disallowed, so process_button_motion doesn't need to be updated.
-            self.qtile.process_button_motion(cx_int, cy_int)
+            self.qtile.process_button_motion(int(cx), int(cy))
+
+        if self.live_dnd:
+            self.live_dnd.position(cx, cy)
+
+        rect = self._hover_rect
+        if (
+            rect
+            and self._hover_epoch == self._z_epoch
+            and rect[0] <= cx < rect[2]
+            and rect[1] <= cy < rect[3]
+        ):
+            # The pointer is still over the same output and the uncovered part of the
+            # focused window, so only that window's surfaces need to be checked.
+            win = self._hovered_window
+            if (
+                win is not None
+                and win.win_kind == window.KIND_WINDOW
+                and win is self.qtile.current_window
+                and not self.exclusive_client
+            ):
+                bw = win.borderwidth
+                surface, sx, sy = win.surface.surface_at(cx - win.x - bw, cy - win.y - bw)
+                if surface:
+                    self._notify_enter(surface, sx, sy)
+                    self._pointer_has_focus = True
+                    self._pointer_origin = (cx - sx, cy - sy)
+                    self._notify_motion(time_msec, sx, sy)
+                    return
 
         if len(self.outputs) > 1:
-            current_wlr_output = self.output_layout.output_at(cx, cy)
-            if current_wlr_output:
-                current_output = current_wlr_output.data
-                if self._current_output is not current_output:
-                    self._current_output = current_output
+            current_output = self._output_at(cx, cy)
+            if current_output and self._current_output is not current_output:
+                previous_output = self._current_output
+                self._current_output = current_output
+                # The Z order only differs between outputs by their layer surfaces
+                if (
+                    previous_output is None
+                    or any(previous_output.layers)
+                    or any(current_output.layers)
+                ):
                     self.stack_windows()
 
-        if self.live_dnd:
-            self.live_dnd.position(cx, cy)
+        self._focus_pointer(int(cx), int(cy), motion=time_msec)
 
-        self._focus_pointer(cx_int, cy_int, motion=time_msec)
+    def _notify_pointer_motion(self, time_msec: int) -> None:
+        """
+        Send the cursor position to the surface with pointer focus, and queue it to be
+        hit-tested. Clients get every motion event this way, while the work of finding
+        what is under the pointer is only done once per event loop dispatch.
+        """
+        origin = self._pointer_origin
+        if origin is not None:
+            cursor = self._cursor_ptr
+            lib.wlr_seat_pointer_notify_motion(
+                self._seat_ptr, time_msec, cursor.x - origin[0], cursor.y - origin[1]
+            )
+        self._pending_motion = time_msec
+
+    def _flush_pointer_motion(self) -> None:
+        """
+        Hit-test the latest cursor position if it has moved since we last did so. This
+        must happen before any other pointer or keyboard input is handled, so that it
+        goes to whatever is now under the pointer.
+        """
+        time_msec = self._pending_motion
+        if time_msec is not None:
+            self._pending_motion = None
+            pointer_state = self._seat_ptr.pointer_state
+            focused = pointer_state.focused_surface
+            self._process_cursor_motion(time_msec, self.cursor.x, self.cursor.y)
+            if self._pointer_has_focus and pointer_state.focused_surface != focused:
+                # Pointer focus moved to another surface, so end the frame it entered in
+                self._notify_frame()
+
+    def _output_at(self, x: float, y: float) -> Output | None:
+        """Get the output at the given layout coordinates."""
+        for x1, y1, x2, y2, output in self._output_rects:
+            if x1 <= x < x2 and y1 <= y < y2:
+                return output
+        return None
 
     def _focus_pointer(self, cx: int, cy: int, motion: int | None = None) -> None:
         assert self.qtile is not None
@@ -767,7 +995,7 @@ class Core(base.Core, wlrq.HasListeners):
             if self.exclusive_client:
                 # If we have a client who exclusively gets input, no other client's
                 # surfaces are allowed to get pointer input.
-                if isinstance(win, base.Internal) or not win.belongs_to_client(
+                if win.win_kind == window.KIND_INTERNAL or not win.belongs_to_client(
                     self.exclusive_client
                 ):
                     # Moved to an internal or unrelated window
@@ -776,11 +1004,12 @@ class Core(base.Core, wlrq.HasListeners):
                             "Pointer focus withheld from window not owned by exclusive client."
                         )
                         self.cursor_manager.set_cursor_image("left_ptr", self.cursor)
-                        self.seat.pointer_notify_clear_focus()
+                        self._clear_pointer_focus()
                         self._hovered_window = win
+                        self._hover_rect = None
                     return
 
-            if isinstance(win, window.Internal):
+            if win.win_kind == window.KIND_INTERNAL:
                 if self._hovered_window is win:
                     # pointer remained within the same Internal window
                     if motion is not None:
@@ -790,7 +1019,7 @@ class Core(base.Core, wlrq.HasListeners):
                         )
                 else:
                     if self._hovered_window:
-                        if isinstance(self._hovered_window, window.Internal):
+                        if self._hovered_window.win_kind == window.KIND_INTERNAL:
                             if motion is not None:
                                 # moved from an Internal to a different Internal
                                 self._hovered_window.process_pointer_leave(
@@ -800,25 +1029,30 @@ class Core(base.Core, wlrq.HasListeners):
                         elif self.seat.pointer_state.focused_surface:
                             # moved from a Window or Static to an Internal
                             self.cursor_manager.set_cursor_image("left_ptr", self.cursor)
-                            self.seat.pointer_notify_clear_focus()
+                            self._clear_pointer_focus()
                     win.process_pointer_enter(cx, cy)
                     self._hovered_window = win
+                    self._hover_rect = None
                 return
 
             if surface:
                 # The pointer is in a client's surface
-                self.seat.pointer_notify_enter(surface, sx, sy)
+                self._notify_enter(surface, sx, sy)
+                self._pointer_has_focus = True
+                # sx and sy were found from the unrounded cursor position
+                cursor = self._cursor_ptr
+                self._pointer_origin = (cursor.x - sx, cursor.y - sy)
                 if motion is not None:
-                    self.seat.pointer_notify_motion(motion, sx, sy)
+                    self._notify_motion(motion, sx, sy)
             else:
                 # The pointer is on the border of a client's window
                 if self.seat.pointer_state.focused_surface:
                     # We just moved out of a client's surface
                     self.cursor_manager.set_cursor_image("left_ptr", self.cursor)
-                    self.seat.pointer_notify_clear_focus()
+                    self._clear_pointer_focus()
 
             if win is not self.qtile.current_window:
-                if isinstance(win, window.Static):
+                if win.win_kind == window.KIND_STATIC:
                     if self._hovered_window is not win:
                         # qtile.current_window will never be a static window, but we
                         # still only want to fire client_mouse_enter once, so check
@@ -841,12 +1075,23 @@ class Core(base.Core, wlrq.HasListeners):
                         ):
                             self.qtile.focus_screen(win.group.screen.index, False)
 
-            self._hovered_window = win
+            if self._hovered_window is not win:
+                self._hovered_window = win
+                self._hover_rect = None
+            if (
+                (self._hover_rect is None or self._hover_epoch != self._z_epoch)
+                and surface
+                and motion is not None
+                and win.win_kind == window.KIND_WINDOW
+                and win is self.qtile.current_window
+            ):
+                self._hover_rect = self._uncovered_rect(win)
+                self._hover_epoch = self._z_epoch
 
         else:
             # There is no window under the pointer
             if self._hovered_window:
-                if isinstance(self._hovered_window, window.Internal):
+                if self._hovered_window.win_kind == window.KIND_INTERNAL:
                     # We just moved out of an Internal
                     self._hovered_window.process_pointer_leave(
                         cx - self._hovered_window.x,
@@ -855,8 +1100,9 @@ class Core(base.Core, wlrq.HasListeners):
                 else:
                     # We just moved out of a Window or Static
                     self.cursor_manager.set_cursor_image("left_ptr", self.cursor)
-                    self.seat.pointer_notify_clear_focus()
+                    self._clear_pointer_focus()
                 self._hovered_window = None
+                self._hover_rect = None
 
     def _process_cursor_button(self, button: int, pressed: bool) -> bool:
         assert self.qtile is not None
@@ -866,7 +1112,7 @@ class Core(base.Core, wlrq.HasListeners):
                 button, self.seat.keyboard.modifier, int(self.cursor.x), int(self.cursor.y)
             )
 
-            if isinstance(self._hovered_window, window.Internal):
+            if self._hovered_window and self._hovered_window.win_kind == window.KIND_INTERNAL:
                 self._hovered_window.process_button_click(
                     int(self.cursor.x - self._hovered_window.x),
                     int(self.cursor.y - self._hovered_window.y),
@@ -875,7 +1121,7 @@ class Core(base.Core, wlrq.HasListeners):
         else:
             handled = self.qtile.process_button_release(button, self.seat.keyboard.modifier)
 
-            if isinstance(self._hovered_window, window.Internal):
+            if self._hovered_window and self._hovered_window.win_kind == window.KIND_INTERNAL:
                 self._hovered_window.process_button_release(
                     int(self.cursor.x - self._hovered_window.x),
                     int(self.cursor.y - self._hovered_window.y),
@@ -884,9 +1130,26 @@ class Core(base.Core, wlrq.HasListeners):
 
         return handled
 
+    def _touch_idle(self) -> None:
+        """
+        Notify the idle manager of user activity. Input devices can send events at high
+        frequencies so this is limited to once every 100 ms, which is far finer than any
+        idle timeout.
+        """
+        now = time.monotonic()
+        if now - self._last_idle_notify > 0.1:
+            self.idle.notify_activity(self.seat)
+            self._last_idle_notify = now
+
+    def _clear_pointer_focus(self) -> None:
+        self._notify_clear()
+        self._pointer_has_focus = False
+        self._pointer_origin = None
+
     def _add_new_pointer(self, wlr_device: input_device.InputDevice) -> inputs.Pointer:
         device = inputs.Pointer(self, wlr_device)
         self._pointers.append(device)
+        self._inputs_info = None
         self.cursor.attach_input_device(wlr_device)
         self.cursor_manager.set_cursor_image("left_ptr", self.cursor)
         return device
@@ -894,6 +1157,7 @@ class Core(base.Core, wlrq.HasListeners):
     def _add_new_keyboard(self, wlr_device: input_device.InputDevice) -> inputs.Keyboard:
         device = inputs.Keyboard(self, wlr_device)
         self.keyboards.append(device)
+        self._inputs_info = None
         self.seat.set_keyboard(wlr_device)
         return device
 
@@ -925,9 +1189,17 @@ class Core(base.Core, wlrq.HasListeners):
             self.fd = None
 
     def _poll(self) -> None:
-        if not self.display.destroyed:
-            self.display.flush_clients()
+        # Handle any events that became ready while dispatching before going back to
+        # asyncio, so that bursts of input are drained in one wakeup.
+        for _ in range(_MAX_DISPATCH):
+            if self.display.destroyed:
+                return
             self.event_loop.dispatch(0)
+            if self.fd is None or not select.select((self.fd,), (), (), 0)[0]:
+                break
+
+        if not self.display.destroyed:
+            self._flush_pointer_motion()
             self.display.flush_clients()
 
     def on_config_load(self, initial: bool) -> None:
@@ -973,8 +1245,9 @@ class Core(base.Core, wlrq.HasListeners):
 
     def new_wid(self) -> int:
         """Get a new unique window ID"""
-        assert self.qtile is not None
-        return max(self.qtile.windows_map.keys(), default=0) + 1
+        wid = self._next_wid
+        self._next_wid += 1
+        return wid
 
     def focus_window(
         self, win: window.WindowType | None, surface: Surface | None = None, enter: bool = True
@@ -1062,7 +1335,7 @@ class Core(base.Core, wlrq.HasListeners):
             if self.exclusive_client:
                 # If we have a client who exclusively gets input, no other client's
                 # surfaces are allowed to get focus.
-                if isinstance(win, base.Internal) or not win.belongs_to_client(
+                if win.win_kind == window.KIND_INTERNAL or not win.belongs_to_client(
                     self.exclusive_client
                 ):
                     logger.debug("Focus withheld from window not owned by exclusive client.")
@@ -1071,16 +1344,16 @@ class Core(base.Core, wlrq.HasListeners):
             if self.qtile.config.bring_front_click is True:
                 win.bring_to_front()
             elif self.qtile.config.bring_front_click == "floating_only":
-                if isinstance(win, base.Window) and win.floating:
+                if win.win_kind == window.KIND_WINDOW and win.floating:
                     win.bring_to_front()
-                elif isinstance(win, base.Static):
+                elif win.win_kind == window.KIND_STATIC:
                     win.bring_to_front()
 
-            if isinstance(win, window.Static):
+            if win.win_kind == window.KIND_STATIC:
                 if win.screen is not self.qtile.current_screen:
                     self.qtile.focus_screen(win.screen.index, warp=False)
                 win.focus(False)
-            elif isinstance(win, window.Window):
+            elif win.win_kind == window.KIND_WINDOW:
                 if win.group and win.group.screen is not self.qtile.current_screen:
                     self.qtile.focus_screen(win.group.screen.index, warp=False)
                 self.qtile.current_group.focus(win, False)
@@ -1097,10 +1370,15 @@ class Core(base.Core, wlrq.HasListeners):
         cy = self.cursor.y
 
         for win in reversed(self.stacked_windows):
-            if isinstance(win, window.Internal):
+            if win.win_kind == window.KIND_INTERNAL:
                 if win.x <= cx <= win.x + win.width and win.y <= cy <= win.y + win.height:
                     return win, None, 0, 0
             else:
+                # A window can be ruled out without calling into wlroots when the cursor
+                # is beyond its surfaces and borders.
+                bounds = self._hit_bounds(win)
+                if bounds and not (bounds[0] <= cx < bounds[2] and bounds[1] <= cy < bounds[3]):
+                    continue
                 bw = win.borderwidth
                 surface, sx, sy = win.surface.surface_at(cx - win.x - bw, cy - win.y - bw)
                 if surface:
@@ -1112,39 +1390,125 @@ class Core(base.Core, wlrq.HasListeners):
                             return win, None, 0, 0
         return None
 
+    def invalidate_hit_cache(self) -> None:
+        """
+        Forget the cached hovered window area, e.g. because windows were moved, resized
+        or restacked, so that the next pointer motion is hit-tested from scratch.
+        """
+        self._z_epoch += 1
+
+    def _hit_bounds(
+        self, win: window.Window | window.Static
+    ) -> tuple[float, float, float, float] | None:
+        """
+        Get the area in layout coordinates outside of which a window's surfaces and
+        borders cannot be under the pointer, or None if it has popups open, which can
+        reach outside of its surface tree.
+        """
+        shell_surface = win.surface
+        if not isinstance(shell_surface, xwayland.Surface) and wlrq.has_popups(shell_surface):
+            return None
+
+        extents = win._hit_extents
+        if extents is None:
+            extents = win._hit_extents = wlrq.surface_extents(shell_surface.surface)
+        x1, y1, x2, y2 = extents
+        bw = win.borderwidth
+        if bw:
+            x1 = min(x1, -bw)
+            y1 = min(y1, -bw)
+            x2 = max(x2, win.width + bw + 1)
+            y2 = max(y2, win.height + bw + 1)
+        x = win.x + bw
+        y = win.y + bw
+        return x + x1, y + y1, x + x2, y + y2
+
+    def _uncovered_rect(self, win: window.Window) -> tuple[float, float, float, float]:
+        """
+        Get the hovered window's area on the output under the pointer, or an empty area
+        if anything stacked above it might overlap it.
+        """
+        cx = self.cursor.x
+        cy = self.cursor.y
+        bw = win.borderwidth
+        x1 = win.x + bw
+        y1 = win.y + bw
+        x2 = x1 + win.width
+        y2 = y1 + win.height
+        for ox1, oy1, ox2, oy2, _output in self._output_rects:
+            if ox1 <= cx < ox2 and oy1 <= cy < oy2:
+                x1 = max(x1, ox1)
+                y1 = max(y1, oy1)
+                x2 = min(x2, ox2)
+                y2 = min(y2, oy2)
+                break
+        else:
+            return 0, 0, 0, 0
+
+        above = False
+        bounds: tuple[float, float, float, float] | None
+        for other in self.stacked_windows:
+            if not above:
+                above = other is win
+                continue
+            if other.win_kind == window.KIND_INTERNAL:
+                bounds = (other.x, other.y, other.x + other.width + 1, other.y + other.height + 1)
+            else:
+                bounds = self._hit_bounds(other)
+                if bounds is None:
+                    return 0, 0, 0, 0
+            if bounds[0] < x2 and x1 < bounds[2] and bounds[1] < y2 and y1 < bounds[3]:
+                return 0, 0, 0, 0
+
+        return x1, y1, x2, y2
+
     def stack_windows(self, restack: window.WindowType | None = None) -> None:
         """
-        Put all windows of all types in a Z-ordered list.
+        Mark the Z order of windows as changed, so that `stacked_windows` is recomposed
+        when next needed. This must be called whenever windows are mapped or unmapped,
+        or the current output changes.
 
         A (non-layer_shell) window passed as 'restack' will bubble up the Z order.
         """
-        if restack:
-            self.mapped_windows.remove(restack)
-            self.mapped_windows.append(restack)
-
-        if self._current_output:
-            layers = self._current_output.layers
-            self.stacked_windows = (
-                layers[LayerShellV1Layer.BACKGROUND]
-                + layers[LayerShellV1Layer.BOTTOM]
-                + self.mapped_windows  # type: ignore
-                + layers[LayerShellV1Layer.TOP]
-                + layers[LayerShellV1Layer.OVERLAY]
-            )
-        else:
-            self.stacked_windows = self.mapped_windows.copy()
+        if restack and restack in self.mapped_windows:
+            # Reinserting a key moves it to the end of the dict's order
+            del self.mapped_windows[restack]
+            self.mapped_windows[restack] = None
 
-    def check_idle_inhibitor(self) -> None:
+        self._stack_dirty = True
+        self._z_epoch += 1
+
+    @property
+    def stacked_windows(self) -> dict[window.WindowType, None]:
+        """All windows of all types in Z-order."""
+        if self._stack_dirty:
+            self._stack_dirty = False
+            if self._current_output:
+                layers = self._current_output.layers
+                self._stacked_windows = dict.fromkeys(
+                    itertools.chain(
+                        layers[LayerShellV1Layer.BACKGROUND],
+                        layers[LayerShellV1Layer.BOTTOM],
+                        self.mapped_windows,
+                        layers[LayerShellV1Layer.TOP],
+                        layers[LayerShellV1Layer.OVERLAY],
+                    )
+                )
+            else:
+                self._stacked_windows = self.mapped_windows.copy()
+
+        return self._stacked_windows
+
+    def check_idle_inhibitor(self, win: window.Window | window.Static) -> None:
         """
-        Checks if any window that is currently mapped has idle inhibitor
-        and if so inhibits idle
+        Checks if a window that was mapped, unmapped or had its idle inhibitors changed
+        now inhibits idle, and inhibits idle while any mapped window does
         """
-        for win in self.mapped_windows:
-            if isinstance(win, (window.Window, window.Static)) and win.is_idle_inhibited:
-                self.idle.set_enabled(self.seat, False)
-                break
+        if win.is_idle_inhibited and win in self.mapped_windows:
+            self._inhibiting_windows.add(win)
         else:
-            self.idle.set_enabled(self.seat, True)
+            self._inhibiting_windows.discard(win)
+        self.idle.set_enabled(self.seat, not self._inhibiting_windows)
 
     def get_screen_info(self) -> list[tuple[int, int, int, int]]:
         """Get the screen information"""
@@ -1152,16 +1516,16 @@ class Core(base.Core, wlrq.HasListeners):
 
     def grab_key(self, key: config.Key | config.KeyChord) -> tuple[int, int]:
         """Configure the backend to grab the key event"""
-        keysym = xkb.keysym_from_name(key.key, case_insensitive=True)
+        keysym = wlrq.keysym_from_name(key.key)
         mask_key = wlrq.translate_masks(key.modifiers)
-        self.grabbed_keys.append((keysym, mask_key))
+        self.grabbed_keys.add((keysym, mask_key))
         return keysym, mask_key
 
     def ungrab_key(self, key: config.Key | config.KeyChord) -> tuple[int, int]:
         """Release the given key event"""
-        keysym = xkb.keysym_from_name(key.key, case_insensitive=True)
+        keysym = wlrq.keysym_from_name(key.key)
         mask_key = wlrq.translate_masks(key.modifiers)
-        self.grabbed_keys.remove((keysym, mask_key))
+        self.grabbed_keys.discard((keysym, mask_key))
         return keysym, mask_key
 
     def ungrab_keys(self) -> None:
@@ -1170,16 +1534,20 @@ class Core(base.Core, wlrq.HasListeners):
 
     def grab_button(self, mouse: config.Mouse) -> int:
         """Configure the backend to grab the mouse event"""
+        if isinstance(mouse, config.Drag):
+            self._has_motion_bindings = True
         return wlrq.translate_masks(mouse.modifiers)
 
+    def ungrab_buttons(self) -> None:
+        """Release the grabbed button events"""
+        self._has_motion_bindings = False
+
     def warp_pointer(self, x: float, y: float) -> None:
         """Warp the pointer to the coordinates in relative to the output layout"""
         self.cursor.warp(WarpMode.LayoutClosest, x, y)
 
-    @contextlib.contextmanager
-    def masked(self) -> Generator:
-        yield
-        self._focus_pointer(int(self.cursor.x), int(self.cursor.y))
+    def masked(self) -> wlrq.Masked:  # type: ignore[override]
+        return wlrq.Masked(self)
 
     def flush(self) -> None:
         self._poll()
@@ -1195,7 +1563,7 @@ class Core(base.Core, wlrq.HasListeners):
         assert self.qtile is not None
 
         # Copy in case the dictionary changes during the loop
-        for win in self.qtile.windows_map.copy().values():
+        for win in tuple(self.qtile.windows_map.values()):
             win.kill()
 
         # give everyone a little time to exit and write their state. but don't
@@ -1212,7 +1580,9 @@ class Core(base.Core, wlrq.HasListeners):
 
     def remove_output(self, output: Output) -> None:
         self.outputs.remove(output)
+        self._output_rects = tuple(r for r in self._output_rects if r[4] is not output)
         self.output_layout.remove(output.wlr_output)
+        self._z_epoch += 1
         if output is self._current_output:
             self._current_output = self.outputs[0] if self.outputs else None
             self.stack_windows()
@@ -1224,11 +1594,11 @@ class Core(base.Core, wlrq.HasListeners):
 
     def keysym_from_name(self, name: str) -> int:
         """Get the keysym for a key from its name"""
-        return xkb.keysym_from_name(name, case_insensitive=True)
+        return wlrq.keysym_from_name(name)
 
     def simulate_keypress(self, modifiers: list[str], key: str) -> None:
         """Simulates a keypress on the focused window."""
-        keysym = xkb.keysym_from_name(key, case_insensitive=True)
+        keysym = wlrq.keysym_from_name(key)
         mods = wlrq.translate_masks(modifiers)
 
         if (keysym, mods) in self.grabbed_keys:
@@ -1287,18 +1657,24 @@ class Core(base.Core, wlrq.HasListeners):
     @expose_command()
     def get_inputs(self) -> dict[str, list[dict[str, str]]]:
         """Get information on all input devices."""
-        info: defaultdict[str, list[dict]] = defaultdict(list)
-        devices: list[inputs._Device] = self.keyboards + self._pointers  # type: ignore
-
-        for dev in devices:
-            type_key, identifier = dev.get_info()
-            type_info = dict(
-                name=dev.wlr_device.name,
-                identifier=identifier,
-            )
-            info[type_key].append(type_info)
+        if self._inputs_info is None:
+            info: dict[str, list[dict[str, str]]] = {}
+            devices: list[inputs._Device] = self.keyboards + self._pointers  # type: ignore
+
+            for dev in devices:
+                type_key, identifier = dev.get_info()
+                type_info = dict(
+                    name=dev.wlr_device.name,
+                    identifier=identifier,
+                )
+                info.setdefault(type_key, []).append(type_info)
+
+            self._inputs_info = info
 
-        return dict(info)
+        # Copy down to the per-device dicts so that callers can't modify the cache
+        return {
+            type_key: [dev.copy() for dev in devs] for type_key, devs in self._inputs_info.items()
+        }
 
     def get_mouse_position(self) -> tuple[int, int]:
         """Get mouse coordinates."""
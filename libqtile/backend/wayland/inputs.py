@@ -219,6 +219,7 @@ class Keyboard(_Device):
     def finalize(self) -> None:
         super().finalize()
         self.core.keyboards.remove(self)
+        self.core._inputs_info = None
         if self.core.keyboards and self.core.seat.keyboard.destroyed:
             self.seat.set_keyboard(self.core.keyboards[-1].wlr_device)
 
@@ -249,7 +250,8 @@ class Keyboard(_Device):
             self.qtile = self.core.qtile
             assert self.qtile is not None
 
-        self.core.idle.notify_activity(self.seat)
+        self.core._touch_idle()
+        self.core._flush_pointer_motion()
 
         if event.state == KEY_PRESSED and not self.core.exclusive_client:
             # translate libinput keycode -> xkbcommon
@@ -295,6 +297,7 @@ class Pointer(_Device):
     def finalize(self) -> None:
         super().finalize()
         self.core._pointers.remove(self)
+        self.core._inputs_info = None
 
     def _on_destroy(self, _listener: Listener, _data: Any) -> None:
         logger.debug("Signal: pointer destroy")
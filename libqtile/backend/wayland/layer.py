@@ -27,6 +27,7 @@ from wlroots.wlr_types.layer_shell_v1 import LayerShellV1Layer, LayerSurfaceV1
 
 from libqtile.backend.wayland.subsurface import SubSurface
 from libqtile.backend.wayland.window import Static
+from libqtile.backend.wayland.wlrq import ptr_key
 from libqtile.command.base import expose_command
 from libqtile.log_utils import logger
 
@@ -89,11 +90,13 @@ class LayerStatic(Static[LayerSurfaceV1]):
         self._layer = self.surface.pending.layer
         if mapped:
             self.output.layers[self._layer].append(self)
+            self._surface_key = ptr_key(self.surface.surface)
+            self.core._surface_owner[self._surface_key] = self
             self.core.stack_windows()
         else:
             self.output.layers[self._layer].remove(self)
-            if self in self.core.stacked_windows:
-                self.core.stacked_windows.remove(self)
+            self.core.stack_windows()
+            self.core._surface_owner.pop(self._surface_key, None)
 
             if self.reserved_space:
                 self.qtile.free_reserved_space(self.reserved_space, self.screen)
@@ -119,6 +122,7 @@ class LayerStatic(Static[LayerSurfaceV1]):
         self.damage()
 
     def _on_commit(self, _listener: Listener, _data: Any) -> None:
+        self._update_hit_extents(self.surface.surface)
         output = self.surface.output and self.surface.output.data
         if output and self.output != output:
             prev_output = self.output
@@ -171,6 +175,7 @@ class LayerStatic(Static[LayerSurfaceV1]):
         self._width = width
         self._height = height
         self.surface.configure(width, height)
+        self.core.invalidate_hit_cache()
         self.damage()
 
     @expose_command()
@@ -20,6 +20,7 @@
 
 from __future__ import annotations
 
+import itertools
 import os
 from typing import TYPE_CHECKING
 
@@ -38,7 +39,7 @@ from libqtile.backend.wayland.wlrq import HasListeners
 from libqtile.log_utils import logger
 
 if TYPE_CHECKING:
-    from typing import Any, Sequence
+    from typing import Any, Iterable
 
     from pywayland.server import Listener
     from wlroots.wlr_types import Surface, Texture
@@ -61,6 +62,8 @@ class Output(HasListeners):
         self._damage: OutputDamage = OutputDamage(wlr_output)
         self.wallpaper: Texture | None = None
         self.x, self.y = self.output_layout.output_coords(wlr_output)
+        # Outputs are kept sorted by position; this is updated when they move
+        self._sort_key: tuple[float, float] = (self.x, self.y)
 
         self.add_listener(wlr_output.destroy_event, self._on_destroy)
         self.add_listener(self._damage.frame_event, self._on_frame)
@@ -83,6 +86,9 @@ class Output(HasListeners):
         self.finalize_listeners()
         self.core.remove_output(self)
 
+    def __lt__(self, other: Output) -> bool:
+        return self._sort_key < other._sort_key
+
     @property
     def screen(self) -> Screen:
         assert self.core.qtile is not None
@@ -130,12 +136,12 @@ class Output(HasListeners):
                     else:
                         renderer.clear([0, 0, 0, 1])
 
-                    mapped: Sequence[WindowType] = (
-                        self.layers[LayerShellV1Layer.BACKGROUND]
-                        + self.layers[LayerShellV1Layer.BOTTOM]
-                        + self.core.mapped_windows  # type: ignore
-                        + self.layers[LayerShellV1Layer.TOP]
-                        + self.layers[LayerShellV1Layer.OVERLAY]
+                    mapped: Iterable[WindowType] = itertools.chain(
+                        self.layers[LayerShellV1Layer.BACKGROUND],
+                        self.layers[LayerShellV1Layer.BOTTOM],
+                        self.core.mapped_windows,
+                        self.layers[LayerShellV1Layer.TOP],
+                        self.layers[LayerShellV1Layer.OVERLAY],
                     )
 
                     for window in mapped:
@@ -40,7 +40,13 @@ from libqtile import config, hook, utils
 from libqtile.backend import base
 from libqtile.backend.base import FloatStates
 from libqtile.backend.wayland.drawer import Drawer
-from libqtile.backend.wayland.wlrq import DRM_FORMAT_ARGB8888, HasListeners
+from libqtile.backend.wayland.wlrq import (
+    DRM_FORMAT_ARGB8888,
+    HasListeners,
+    box_center,
+    ptr_key,
+    surface_extents,
+)
 from libqtile.command.base import CommandError, expose_command
 from libqtile.log_utils import logger
 
@@ -58,6 +64,12 @@ if typing.TYPE_CHECKING:
 
 S = typing.TypeVar("S", bound=PtrHasData)
 
+# Each window class has one of these as its win_kind, which the pointer event handlers
+# compare instead of using isinstance as they run for every pointer sample.
+KIND_INTERNAL: typing.Final = 0
+KIND_WINDOW: typing.Final = 1
+KIND_STATIC: typing.Final = 2
+
 
 @functools.lru_cache()
 def _rgb(color: ColorType) -> ffi.CData:
@@ -69,6 +81,8 @@ def _rgb(color: ColorType) -> ffi.CData:
 
 class _Base:
     _wid: int
+    core: Core
+    _hit_extents: tuple[int, int, int, int] | None
 
     @property
     def wid(self) -> int:
@@ -90,6 +104,16 @@ class _Base:
     def height(self, height: int) -> None:
         self._height = height
 
+    def _update_hit_extents(self, surface: Surface) -> None:
+        """
+        Recompute the extents of a committed surface tree. The core's hit-test cache is
+        only invalidated when they changed, as most commits just update the contents.
+        """
+        extents = surface_extents(surface)
+        if extents != self._hit_extents:
+            self._hit_extents = extents
+            self.core.invalidate_hit_cache()
+
 
 class Window(typing.Generic[S], _Base, base.Window, HasListeners):
     """
@@ -99,6 +123,8 @@ class Window(typing.Generic[S], _Base, base.Window, HasListeners):
     concrete classes are responsible for implementing a few others.
     """
 
+    win_kind: typing.Literal[1] = KIND_WINDOW
+
     def __init__(self, core: Core, qtile: Qtile, surface: S):
         base.Window.__init__(self)
         self.core = core
@@ -113,6 +139,10 @@ class Window(typing.Generic[S], _Base, base.Window, HasListeners):
         self._outputs: set[Output] = set()
         self._wm_class: str | None = None
         self._idle_inhibitors_count: int = 0
+        # The address of our wlr_surface, set while we are mapped
+        self._surface_key: int = 0
+        # Bounds of our surface tree used to skip hit tests, reset on every commit
+        self._hit_extents: tuple[int, int, int, int] | None = None
 
         # This is a placeholder to be set properly when the window maps for the first
         # time (and therefore exposed to the user). We need the attribute to exist so
@@ -159,13 +189,16 @@ class Window(typing.Generic[S], _Base, base.Window, HasListeners):
             return
         self._mapped = mapped
         if mapped:
-            self.core.mapped_windows.append(self)
+            self.core.mapped_windows[self] = None
+            self._surface_key = ptr_key(self.surface.surface)  # type: ignore
+            self.core._surface_owner[self._surface_key] = self
             self.core.stack_windows()
         else:
-            self.core.mapped_windows.remove(self)
-            self.core.stacked_windows.remove(self)
+            self.core.mapped_windows.pop(self, None)
+            self.core.stack_windows()
+            self.core._surface_owner.pop(self._surface_key, None)
         if self._idle_inhibitors_count > 0:
-            self.core.check_idle_inhibitor()
+            self.core.check_idle_inhibitor(self)
 
     def _on_destroy(self, _listener: Listener, _data: Any) -> None:
         logger.debug("Signal: window destroy")
@@ -173,14 +206,13 @@ class Window(typing.Generic[S], _Base, base.Window, HasListeners):
             logger.warning("Window destroyed before unmap event.")
             self.mapped = False
 
-        if self in self.core.pending_windows:
-            self.core.pending_windows.remove(self)
-        else:
+        if self.core.pending_windows.pop(ptr_key(self.surface), None) is None:
             self.qtile.unmanage(self.wid)
 
         self.finalize()
 
     def _on_commit(self, _listener: Listener, _data: Any) -> None:
+        self._update_hit_extents(self.surface.surface)  # type: ignore
         self.damage()
 
     def _on_foreign_request_maximize(
@@ -219,11 +251,12 @@ class Window(typing.Generic[S], _Base, base.Window, HasListeners):
         self._idle_inhibitors_count -= 1
         listener.remove()
         if self._idle_inhibitors_count == 0:
-            self.core.check_idle_inhibitor()
+            self.core.check_idle_inhibitor(self)
 
     def _find_outputs(self) -> None:
         """Find the outputs on which this window can be seen."""
         self._outputs = set(o for o in self.core.outputs if o.contains(self))
+        self.core.invalidate_hit_cache()
 
     def damage(self) -> None:
         for output in self._outputs:
@@ -473,7 +506,7 @@ class Window(typing.Generic[S], _Base, base.Window, HasListeners):
             inhibitor.data = self
             self.add_listener(inhibitor.destroy_event, self._on_inhibitor_destroy)
             if self._idle_inhibitors_count == 1:
-                self.core.check_idle_inhibitor()
+                self.core.check_idle_inhibitor(self)
 
     @property
     def is_idle_inhibited(self) -> bool:
@@ -614,8 +647,10 @@ class Window(typing.Generic[S], _Base, base.Window, HasListeners):
         win.place(x, y, width, height, 0, None)
         self.qtile.windows_map[self.wid] = win
         if self.mapped:
-            self.core.mapped_windows.remove(self)
-            self.core.stacked_windows.remove(self)
+            self.core.mapped_windows.pop(self, None)
+            self.core.stack_windows()
+            if self._idle_inhibitors_count > 0:
+                self.core.check_idle_inhibitor(self)
 
     @expose_command()
     def is_visible(self) -> bool:
@@ -628,6 +663,8 @@ class Window(typing.Generic[S], _Base, base.Window, HasListeners):
 
 
 class Static(typing.Generic[S], _Base, base.Static, HasListeners):
+    win_kind: typing.Literal[2] = KIND_STATIC
+
     def __init__(
         self,
         core: Core,
@@ -653,6 +690,8 @@ class Static(typing.Generic[S], _Base, base.Static, HasListeners):
         self._outputs: set[Output] = set()
         self._wm_class: str | None = None
         self._idle_inhibitors_count = idle_inhibitor_count
+        self._surface_key: int = 0
+        self._hit_extents: tuple[int, int, int, int] | None = None
 
         if surface.data:
             self.ftm_handle = surface.data
@@ -677,14 +716,20 @@ class Static(typing.Generic[S], _Base, base.Static, HasListeners):
         self._mapped = mapped
 
         if mapped:
-            self.core.mapped_windows.append(self)
+            self.core.mapped_windows[self] = None
+            self._surface_key = ptr_key(self.surface.surface)  # type: ignore
+            self.core._surface_owner[self._surface_key] = self
             self.core.stack_windows()
         else:
-            self.core.mapped_windows.remove(self)
-            self.core.stacked_windows.remove(self)
+            self.core.mapped_windows.pop(self, None)
+            self.core.stack_windows()
+            self.core._surface_owner.pop(self._surface_key, None)
+        if self._idle_inhibitors_count > 0:
+            self.core.check_idle_inhibitor(self)
 
     def _find_outputs(self) -> None:
         self._outputs = set(o for o in self.core.outputs if o.contains(self))
+        self.core.invalidate_hit_cache()
 
     def damage(self) -> None:
         for output in self._outputs:
@@ -733,14 +778,13 @@ class Static(typing.Generic[S], _Base, base.Static, HasListeners):
             logger.warning("Window destroyed before unmap event.")
             self.mapped = False
 
-        if self in self.core.pending_windows:
-            self.core.pending_windows.remove(self)
-        else:
+        if self.core.pending_windows.pop(ptr_key(self.surface), None) is None:
             self.qtile.unmanage(self.wid)
 
         self.finalize()
 
     def _on_commit(self, _listener: Listener, _data: Any) -> None:
+        self._update_hit_extents(self.surface.surface)  # type: ignore
         self.damage()
 
     def _on_foreign_request_close(self, _listener: Listener, _data: Any) -> None:
@@ -753,7 +797,7 @@ class Static(typing.Generic[S], _Base, base.Static, HasListeners):
         self._idle_inhibitors_count -= 1
         listener.remove()
         if self._idle_inhibitors_count == 0:
-            self.core.check_idle_inhibitor()
+            self.core.check_idle_inhibitor(self)
 
     def add_idle_inhibitor(
         self, surface: Surface, _x: int, _y: int, inhibitor: IdleInhibitorV1 | None
@@ -763,7 +807,7 @@ class Static(typing.Generic[S], _Base, base.Static, HasListeners):
             inhibitor.data = self
             self.add_listener(inhibitor.destroy_event, self._on_inhibitor_destroy)
             if self._idle_inhibitors_count == 1:
-                self.core.check_idle_inhibitor()
+                self.core.check_idle_inhibitor(self)
 
     @property
     def is_idle_inhibited(self) -> bool:
@@ -797,6 +841,8 @@ class Internal(_Base, base.Internal):
     Internal windows are simply textures controlled by the compositor.
     """
 
+    win_kind: typing.Literal[0] = KIND_INTERNAL
+
     def __init__(self, core: Core, qtile: Qtile, x: int, y: int, width: int, height: int):
         self.core = core
         self.qtile = qtile
@@ -843,11 +889,11 @@ class Internal(_Base, base.Internal):
             return
         self._mapped = mapped
         if mapped:
-            self.core.mapped_windows.append(self)
+            self.core.mapped_windows[self] = None
             self.core.stack_windows()
         else:
-            self.core.mapped_windows.remove(self)
-            self.core.stacked_windows.remove(self)
+            self.core.mapped_windows.pop(self, None)
+            self.core.stack_windows()
 
     def hide(self) -> None:
         self.mapped = False
@@ -899,6 +945,7 @@ class Internal(_Base, base.Internal):
             self.texture = self._new_texture()
 
         self._outputs = set(o for o in self.core.outputs if o.contains(self))
+        self.core.invalidate_hit_cache()
         self.damage()
 
     @expose_command()
@@ -977,10 +1024,17 @@ class PointerConstraint(HasListeners):
         rect = self.wlr_constraint.region.rectangles_as_boxes()[0]
         rect.x += self.window.x + self.window.borderwidth
         rect.y += self.window.y + self.window.borderwidth
-        self._warp_target = (rect.x + rect.width / 2, rect.y + rect.height / 2)
+        self._warp_target = box_center(rect)
         self.rect = rect
         self._needs_warp = True
 
+        if self.core.active_pointer_constraint is self:
+            core = self.core
+            core._apc_x1 = rect.x
+            core._apc_y1 = rect.y
+            core._apc_x2 = rect.x + rect.width
+            core._apc_y2 = rect.y + rect.height
+
     def enable(self) -> None:
         logger.debug("Enabling pointer constraints.")
         self.core.active_pointer_constraint = self
@@ -27,8 +27,10 @@ from typing import TYPE_CHECKING
 
 import cairocffi
 from pywayland.server import Listener
+from wlroots import ffi, lib
 from wlroots.wlr_types import Texture
 from wlroots.wlr_types.keyboard import KeyboardModifier
+from xkbcommon import xkb
 
 from libqtile.log_utils import logger
 from libqtile.utils import QtileError
@@ -37,8 +39,12 @@ if TYPE_CHECKING:
     from typing import Any, Callable
 
     from pywayland.server import Signal
-    from wlroots import xwayland
-    from wlroots.wlr_types import Surface, data_device_manager
+    from wlroots import Ptr, xwayland
+    from wlroots.util.box import Box
+    from wlroots.wlr_types import Output as wlrOutput
+    from wlroots.wlr_types import OutputLayout, Surface, data_device_manager
+    from wlroots.wlr_types.layer_shell_v1 import LayerSurfaceV1
+    from wlroots.wlr_types.xdg_shell import XdgSurface
 
     from libqtile.backend.wayland.core import Core
     from libqtile.backend.wayland.output import Output
@@ -84,6 +90,8 @@ buttons = [
     BTN_SIDE,
     BTN_EXTRA,
 ]
+# Maps the above to their qtile button numbers
+BUTTON_MAP = {b: i + 1 for i, b in enumerate(buttons)}
 
 # from drm_fourcc.h
 DRM_FORMAT_ARGB8888 = 875713089
@@ -94,6 +102,11 @@ def translate_masks(modifiers: list[str]) -> int:
     Translate a modifier mask specified as a list of strings into an or-ed
     bit representation.
     """
+    return _translate_masks(tuple(modifiers))
+
+
+@functools.lru_cache()
+def _translate_masks(modifiers: tuple[str, ...]) -> int:
     masks = []
     for i in modifiers:
         try:
@@ -106,6 +119,58 @@ def translate_masks(modifiers: list[str]) -> int:
         return 0
 
 
+@functools.lru_cache()
+def keysym_from_name(name: str) -> int:
+    """Get the keysym for a key name, caching the result as configs reuse key names."""
+    return xkb.keysym_from_name(name, case_insensitive=True)
+
+
+def ptr_key(obj: Ptr | ffi.CData) -> int:
+    """
+    Get the address of the C struct wrapped by a pywlroots object, or pointed to by a
+    raw cffi pointer, which can be used as a dictionary key to look up our objects from
+    the wlroots ones.
+    """
+    if isinstance(obj, ffi.CData):
+        return int(ffi.cast("uintptr_t", obj))
+    return int(ffi.cast("uintptr_t", obj._ptr))
+
+
+def box_center(box: Box) -> tuple[int, int]:
+    """Get the centre point of a box using integer arithmetic on its C struct."""
+    ptr = box._ptr
+    return ptr.x + (ptr.width >> 1), ptr.y + (ptr.height >> 1)
+
+
+def output_layout_box(
+    output_layout: OutputLayout, wlr_output: wlrOutput
+) -> tuple[int, int, int, int]:
+    """
+    Get the x, y, width and height of an output in the output layout, or all zeros if it
+    isn't in the layout. This reads the box straight from wlroots without wrapping it.
+    """
+    box_ptr = lib.wlr_output_layout_get_box(output_layout._ptr, wlr_output._ptr)
+    if box_ptr == ffi.NULL:
+        return 0, 0, 0, 0
+    return box_ptr.x, box_ptr.y, box_ptr.width, box_ptr.height
+
+
+def surface_extents(surface: Surface) -> tuple[int, int, int, int]:
+    """
+    Get the bounds of a surface and all of its subsurfaces in surface-local coordinates,
+    as x1, y1, x2, y2 with the far edges exclusive.
+    """
+    box = ffi.new("struct wlr_box *")
+    lib.wlr_surface_get_extends(surface._ptr, box)
+    return box.x, box.y, box.x + box.width, box.y + box.height
+
+
+def has_popups(surface: XdgSurface | LayerSurfaceV1) -> bool:
+    """Check whether an XDG or layer surface currently has any popups open."""
+    popups = ffi.addressof(surface._ptr, "popups")
+    return popups.next != popups
+
+
 class Painter:
     def __init__(self, core: Core):
         self.core = core
@@ -233,10 +298,15 @@ class Dnd(HasListeners):
             output.damage()
 
 
-def get_xwayland_atoms(xwayland: xwayland.XWayland) -> dict[int, str]:
+def get_xwayland_atoms(
+    xwayland: xwayland.XWayland,
+) -> tuple[list[str | None], dict[int, str]]:
     """
     These can be used when matching on XWayland clients with wm_type.
     http://standards.freedesktop.org/wm-spec/latest/ar01s05.html#idm139870830002400
+
+    Atom IDs are small integers, so as well as the mapping of atom to name we return a
+    list indexed by atom ID for fast lookups.
     """
     xwayland_wm_types = {
         "_NET_WM_WINDOW_TYPE_DESKTOP": "desktop",
@@ -259,7 +329,33 @@ def get_xwayland_atoms(xwayland: xwayland.XWayland) -> dict[int, str]:
     for atom, name in xwayland_wm_types.items():
         atoms[xwayland.get_atom(atom)] = name
 
-    return atoms
+    atoms_arr: list[str | None] = [None] * (max(atoms, default=-1) + 1)
+    for atom_id, name in atoms.items():
+        atoms_arr[atom_id] = name
+
+    return atoms_arr, atoms
+
+
+class Masked:
+    """
+    The context manager returned by `Core.masked`, which refocuses whatever is under the
+    pointer once qtile has finished rearranging windows. This is entered every time a
+    group is laid out, so is implemented as a class rather than a generator-based
+    context manager.
+    """
+
+    __slots__ = ("core",)
+
+    def __init__(self, core: Core):
+        self.core = core
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, exc_type: Any, _exc_value: Any, _traceback: Any) -> None:
+        if exc_type is None:
+            cursor = self.core.cursor
+            self.core._focus_pointer(int(cursor.x), int(cursor.y))
 
 
 @dataclass()
@@ -36,7 +36,7 @@ from libqtile.backend import base
 from libqtile.backend.base import FloatStates
 from libqtile.backend.wayland.subsurface import SubSurface
 from libqtile.backend.wayland.window import Static, Window
-from libqtile.backend.wayland.wlrq import HasListeners
+from libqtile.backend.wayland.wlrq import HasListeners, ptr_key
 from libqtile.command.base import expose_command
 from libqtile.log_utils import logger
 
@@ -84,8 +84,7 @@ class XdgWindow(Window[XdgSurface]):
         if not self._wm_class == self.surface.toplevel.app_id:
             self._wm_class = self.surface.toplevel.app_id
 
-        if self in self.core.pending_windows:
-            self.core.pending_windows.remove(self)
+        if self.core.pending_windows.pop(ptr_key(self.surface), None) is not None:
             self._wid = self.core.new_wid()
             logger.debug(
                 "Managing new top-level window with window ID: %s, app_id: %s",
@@ -149,6 +148,7 @@ class XdgWindow(Window[XdgSurface]):
 
     def _on_new_popup(self, _listener: Listener, xdg_popup: XdgPopup) -> None:
         logger.debug("Signal: xdgwindow new_popup")
+        self.core.invalidate_hit_cache()
         self.popups.append(XdgPopupWindow(self, xdg_popup))
 
     def _on_new_subsurface(self, _listener: Listener, subsurface: WlrSubSurface) -> None:
@@ -455,6 +455,7 @@ class XdgPopupWindow(HasListeners):
 
     def _on_new_popup(self, _listener: Listener, xdg_popup: XdgPopup) -> None:
         logger.debug("Signal: popup new_popup")
+        self.core.invalidate_hit_cache()
         self.popups.append(XdgPopupWindow(self, xdg_popup))
 
     def _on_commit(self, _listener: Listener, _data: Any) -> None:
@@ -28,6 +28,7 @@ from libqtile import hook
 from libqtile.backend import base
 from libqtile.backend.base import FloatStates
 from libqtile.backend.wayland.window import Static, Window
+from libqtile.backend.wayland.wlrq import ptr_key
 from libqtile.command.base import expose_command
 from libqtile.log_utils import logger
 
@@ -70,8 +71,7 @@ class XWindow(Window[xwayland.Surface]):
     def _on_map(self, _listener: Listener, _data: Any) -> None:
         logger.debug("Signal: xwindow map")
 
-        if self in self.core.pending_windows:
-            self.core.pending_windows.remove(self)
+        if self.core.pending_windows.pop(ptr_key(self.surface), None) is not None:
             self._wid = self.core.new_wid()
             logger.debug("Managing new XWayland window with window ID: %s", self._wid)
             surface = self.surface
@@ -142,7 +142,7 @@ class XWindow(Window[xwayland.Surface]):
             self.add_listener(self.surface.map_event, self._on_map)
             self.add_listener(self.surface.unmap_event, self._on_unmap)
             self.add_listener(self.surface.destroy_event, self._on_destroy)
-            self.core.pending_windows.add(self)
+            self.core.pending_windows[ptr_key(self.surface)] = self
             self._wid = -1
 
         self._unmapping = False
@@ -205,7 +205,9 @@ class XWindow(Window[xwayland.Surface]):
     def get_wm_type(self) -> str | None:
         wm_type = self.surface.window_type
         if wm_type:
-            return self.core.xwayland_atoms[wm_type[0]]
+            atoms = self.core.xwayland_atoms_arr
+            atom = wm_type[0]
+            return atoms[atom] if atom < len(atoms) else None
         return None
 
     def get_wm_role(self) -> str | None:
@@ -46,6 +46,7 @@
 #
 # This is not intended to be a complete cffi-based pango binding.
 
+import itertools
 
 try:
     from libqtile._ffi_pango import ffi
@@ -191,3 +192,33 @@ def parse_markup(value, accel_marker=0):
 def markup_escape_text(text):
     ret = gobject.g_markup_escape_text(text.encode("utf-8"), -1)
     return ffi.string(ret).decode()
+
+
+# The same escapes that g_markup_escape_text makes, for use with str.translate
+_MARKUP_TABLE = str.maketrans(
+    {
+        "&": "&amp;",
+        "<": "&lt;",
+        ">": "&gt;",
+        "'": "&apos;",
+        '"': "&quot;",
+        **{
+            chr(c): f"&#x{c:x};"
+            for c in itertools.chain(
+                range(0x01, 0x09),
+                (0x0B, 0x0C),
+                range(0x0E, 0x20),
+                range(0x7F, 0x85),
+                range(0x86, 0xA0),
+            )
+        },
+    }
+)
+
+
+def markup_escape_text_fast(text):
+    """
+    Escape text like markup_escape_text, but without a call through cffi. Useful when
+    escaping many strings at a time.
+    """
+    return text.translate(_MARKUP_TABLE)
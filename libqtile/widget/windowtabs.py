@@ -57,6 +57,8 @@ class WindowTabs(base._TextBox):
         self.add_defaults(WindowTabs.defaults)
         if not isinstance(self.selected, (tuple, list)):
             self.selected = (self.selected, self.selected)
+        # The text of the last update, so that unchanged text doesn't redraw the bar
+        self._last_text = None
 
     def _configure(self, qtile, bar):
         base._TextBox._configure(self, qtile, bar)
@@ -66,24 +68,32 @@ class WindowTabs(base._TextBox):
         self.add_callbacks({"Button1": self.bar.screen.group.next_window})
 
     def update(self, *args):
+        group = self.bar.screen.group
+        current_window = group.current_window
+        sel_start, sel_end = self.selected
+        escape = pangocffi.markup_escape_text_fast
         names = []
-        for w in self.bar.screen.group.windows:
-            state = ""
+        for w in group.windows:
             if w.maximized:
                 state = "[] "
             elif w.minimized:
                 state = "_ "
             elif w.floating:
                 state = "V "
-            task = "%s%s" % (state, w.name if w and w.name else " ")
-            task = pangocffi.markup_escape_text(task)
-            if w is self.bar.screen.group.current_window:
-                task = task.join(self.selected)
+            else:
+                state = ""
+            task = escape(state + (w.name or " "))
+            if w is current_window:
+                task = f"{sel_start}{task}{sel_end}"
             names.append(task)
-        self.text = self.separator.join(names)
+        text = self.separator.join(names)
         if callable(self.parse_text):
             try:
-                self.text = self.parse_text(self.text)
+                text = self.parse_text(text)
             except:  # noqa: E722
                 logger.exception("parse_text function failed:")
+        if text == self._last_text:
+            return
+        self._last_text = text
+        self.text = text
         self.bar.draw()
@@ -26,47 +26,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import sys
-import textwrap
-
 from setuptools import setup
-from setuptools.command.install import install
-
-
-class CheckCairoXcb(install):
-    def cairo_xcb_check(self):
-        try:
-            from cairocffi import cairo
-
-            cairo.cairo_xcb_surface_create
-            return True
-        except AttributeError:
-            return False
-
-    def finalize_options(self):
-        if not self.cairo_xcb_check():
-
-            print(
-                textwrap.dedent(
-                    """
-
-            It looks like your cairocffi was not built with xcffib support.  To fix this:
-
-              - Ensure a recent xcffib is installed (pip install 'xcffib>=0.5.0')
-              - The pip cache is cleared (remove ~/.cache/pip, if it exists)
-              - Reinstall cairocffi, either:
-
-                  pip install --no-deps --ignore-installed cairocffi
-
-                or
-
-                  pip uninstall cairocffi && pip install cairocffi
-            """
-                )
-            )
-
-            sys.exit(1)
-        install.finalize_options(self)
 
 
 def get_cffi_modules():
@@ -103,7 +63,6 @@ def get_cffi_modules():
 
 
 setup(
-    cmdclass={"install": CheckCairoXcb},
     use_scm_version=True,
     cffi_modules=get_cffi_modules(),
     include_package_data=True,
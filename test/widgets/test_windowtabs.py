@@ -23,7 +23,7 @@
 import pytest
 
 import libqtile.config
-from libqtile import bar, layout, widget
+from libqtile import bar, layout, pangocffi, widget
 from libqtile.config import Screen
 from libqtile.confreader import Config
 
@@ -135,3 +135,60 @@ def test_escaping_text(manager):
     """
     manager.test_window("Text & Text")
     assert manager.c.widget["windowtabs"].info()["text"] == "<b>Text &amp; Text</b>"
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "&<>'\"",
+        "".join(chr(c) for c in range(0x01, 0x20)),
+        "".join(chr(c) for c in range(0x7F, 0xA0)),
+        "Text & <b>Text</b> \u00e9\u2713",
+    ],
+)
+def test_markup_escape_text_fast(text):
+    """The str.translate based escaping must match g_markup_escape_text."""
+    assert pangocffi.markup_escape_text_fast(text) == pangocffi.markup_escape_text(text)
+
+
+class FakeWindow:
+    def __init__(self, name):
+        self.name = name
+        self.maximized = False
+        self.minimized = False
+        self.floating = False
+
+
+class FakeGroup:
+    def __init__(self, windows):
+        self.windows = windows
+        self.current_window = windows[0]
+
+
+class FakeScreen:
+    def __init__(self, group):
+        self.group = group
+
+
+def test_redraw_only_on_text_change(fake_bar, monkeypatch):
+    """The bar is only redrawn when an update changes the widget's text."""
+    draws = []
+    monkeypatch.setattr(fake_bar, "draw", lambda: draws.append(True))
+    windows = [FakeWindow("one"), FakeWindow("two")]
+    fake_bar.screen = FakeScreen(FakeGroup(windows))
+
+    tabs = widget.WindowTabs()
+    tabs.bar = fake_bar
+
+    tabs.update()
+    assert tabs.text == "<b>one</b> | two"
+    assert len(draws) == 1
+
+    # Nothing about the windows changed
+    tabs.update()
+    assert len(draws) == 1
+
+    windows[1].name = "three"
+    tabs.update()
+    assert tabs.text == "<b>one</b> | three"
+    assert len(draws) == 2